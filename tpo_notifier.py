@@ -13,19 +13,29 @@ Free Hosting Options:
 Author: Shubham Galande
 """
 
+import time
+MODULE_LOAD_STARTED = time.perf_counter()  # startup timing for the run summary
+
 import os
+import re
+import sys
+import html
 import json
-import time
+import bisect
+import difflib
 import hashlib
 import logging
+import platform
+import threading
+import subprocess
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 import requests
+# Selenium and webdriver-manager are imported lazily, only when a browser is needed
+
+try:
+    import fcntl  # POSIX advisory locks
+except ImportError:  # Windows
+    fcntl = None
         
 # ============================================
 # CONFIGURATION - Update these values
@@ -51,8 +61,30 @@ WHATSAPP_API_KEY = os.getenv("WHATSAPP_API_KEY", "")  # API key from CallMeBot
 # Check interval in seconds (default: 30 minutes)
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "1800"))
 
+# Telegram bot commands (/list, /open, /company, /check) - service mode only
+TELEGRAM_COMMANDS_ENABLED = os.getenv("TELEGRAM_COMMANDS_ENABLED", "true").lower() == "true"
+TELEGRAM_POLL_TIMEOUT = int(os.getenv("TELEGRAM_POLL_TIMEOUT", "50"))  # getUpdates long-poll seconds
+
 # File to store known companies (for persistence)
 DATA_FILE = os.getenv("DATA_FILE", "known_companies.json")
+BACKUP_FILE = os.getenv("BACKUP_FILE", DATA_FILE + ".bak")  # previous good generation
+
+# Lock file so only one check runs at a time (overlapping cron runs exit fast)
+LOCK_FILE = os.getenv("LOCK_FILE", DATA_FILE + ".lock")
+
+# Optional cheap change probe for --once runs: a URL whose content changes when
+# companies are added. If it is unchanged, the browser check is skipped, but a
+# full check still runs at least every PROBE_MAX_SKIP seconds (default: 6 hours)
+PROBE_URL = os.getenv("PROBE_URL", "")
+PROBE_MAX_SKIP = int(os.getenv("PROBE_MAX_SKIP", "21600"))
+
+# Chromedriver resolution: an explicit path wins, otherwise the path resolved by
+# webdriver-manager is cached per machine/Chrome version
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", "")
+DRIVER_CACHE_FILE = os.getenv(
+    "DRIVER_CACHE_FILE",
+    os.path.join(os.path.expanduser("~"), ".cache", "tpo_notifier", "chromedriver.json")
+)
 
 # Logging configuration
 logging.basicConfig(
@@ -65,16 +97,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Startup/phase timings (seconds) reported in the --once run summary
+RUN_TIMINGS = {"imports": time.perf_counter() - MODULE_LOAD_STARTED}
+
 # ============================================
 # TELEGRAM FUNCTIONS
 # ============================================
 
-def send_telegram_message(message: str) -> bool:
-    """Send a message to Telegram"""
+def send_telegram_message(message: str, chat_id: str = None) -> bool:
+    """Send a message to Telegram (defaults to the configured chat)"""
     try:
         url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
         payload = {
-            "chat_id": TELEGRAM_CHAT_ID,
+            "chat_id": chat_id or TELEGRAM_CHAT_ID,
             "text": message,
             "parse_mode": "HTML"
         }
@@ -111,7 +146,6 @@ def send_telegram_document(file_path: str, caption: str = "") -> bool:
 
 def html_to_whatsapp(html_text: str) -> str:
     """Convert HTML formatting to WhatsApp formatting"""
-    import re
     # Convert HTML bold to WhatsApp bold
     text = re.sub(r'<b>(.*?)</b>', r'*\1*', html_text)
     text = re.sub(r'<strong>(.*?)</strong>', r'*\1*', text)
@@ -120,6 +154,8 @@ def html_to_whatsapp(html_text: str) -> str:
     text = re.sub(r'<em>(.*?)</em>', r'_\1_', text)
     # Remove other HTML tags
     text = re.sub(r'<[^>]+>', '', text)
+    # Turn escaped values (e.g. &amp;) back into plain text
+    text = html.unescape(text)
     return text.strip()
 
 
@@ -172,26 +208,151 @@ def send_notification(message: str) -> bool:
 # DATA PERSISTENCE
 # ============================================
 
-def load_known_companies() -> dict:
-    """Load previously known companies from file"""
+def companies_checksum(companies: list) -> str:
+    """Checksum of the company list, stored alongside it to detect corruption"""
+    payload = json.dumps(companies, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def read_data_file(path: str):
+    """Read and verify a data file, returning None if missing, empty or corrupt"""
     try:
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r') as f:
-                return json.load(f)
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        if os.path.getsize(path) == 0:
+            return None
+        logger.error(f"Corrupt data file {path}: {e}")
+        return None
     except Exception as e:
-        logger.error(f"Error loading known companies: {e}")
-    return {"companies": [], "last_check": None}
+        logger.error(f"Corrupt data file {path}: {e}")
+        return None
+    
+    if not isinstance(data, dict) or not isinstance(data.get("companies"), list):
+        logger.error(f"Corrupt data file {path}: missing company list")
+        return None
+    # Files written before checksums were added have none; accept them as-is
+    checksum = data.get("checksum")
+    if checksum and checksum != companies_checksum(data["companies"]):
+        logger.error(f"Corrupt data file {path}: checksum mismatch")
+        return None
+    return data
+
+
+def load_known_companies() -> dict:
+    """Load previously known companies, falling back to the backup if corrupt.
+
+    If state existed but neither generation is readable, "state_lost" is set so
+    the caller can re-baseline instead of re-alerting every company. An empty
+    DATA_FILE with no backup (as shipped in the repo) just means no state yet.
+    """
+    for path in (DATA_FILE, BACKUP_FILE):
+        data = read_data_file(path)
+        if data is not None:
+            if path != DATA_FILE:
+                logger.warning(f"Recovered known companies from backup {path}")
+            return data
+    
+    state_lost = os.path.exists(BACKUP_FILE) or (
+        os.path.exists(DATA_FILE) and os.path.getsize(DATA_FILE) > 0
+    )
+    if state_lost:
+        logger.error("Known companies could not be recovered, starting fresh")
+    return {"companies": [], "last_check": None, "state_lost": state_lost}
+
+
+def fsync_directory(path: str):
+    """Flush a directory entry so a rename survives a crash (no-op where unsupported)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
 
 
 def save_known_companies(data: dict):
-    """Save known companies to file"""
+    """Save known companies atomically (write temp file, fsync, rename)"""
+    tmp_file = f"{DATA_FILE}.{os.getpid()}.tmp"
     try:
+        data.pop("state_lost", None)
         data["last_check"] = datetime.now().isoformat()
-        with open(DATA_FILE, 'w') as f:
+        data["checksum"] = companies_checksum(data["companies"])
+        
+        with open(tmp_file, 'w') as f:
             json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        
+        # Keep the previous generation as a backup, but never overwrite a good
+        # backup with a corrupt file
+        if read_data_file(DATA_FILE) is not None:
+            os.replace(DATA_FILE, BACKUP_FILE)
+        os.replace(tmp_file, DATA_FILE)
+        fsync_directory(os.path.dirname(os.path.abspath(DATA_FILE)))
         logger.info(f"Saved {len(data['companies'])} companies to {DATA_FILE}")
     except Exception as e:
         logger.error(f"Error saving known companies: {e}")
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+
+
+def acquire_instance_lock():
+    """Take an exclusive advisory lock on LOCK_FILE without blocking.
+
+    Returns (acquired, lock_file). acquired is False only if another process
+    holds the lock. If locking itself fails (e.g. read-only directory), the
+    check runs unlocked with lock_file None. Pass lock_file to
+    release_instance_lock when done.
+    """
+    if fcntl is None:
+        logger.warning("File locking not supported on this platform, running unlocked")
+        return True, None
+    
+    try:
+        lock_file = open(LOCK_FILE, 'a+')
+    except OSError as e:
+        logger.warning(f"Could not open lock file {LOCK_FILE}: {e}, running unlocked")
+        return True, None
+    
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False, None
+    except OSError as e:
+        logger.warning(f"Could not lock {LOCK_FILE}: {e}, running unlocked")
+        lock_file.close()
+        return True, None
+    
+    try:
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+    except OSError:
+        pass  # the PID is informational only
+    return True, lock_file
+
+
+def release_instance_lock(lock_file):
+    """Release a lock taken with acquire_instance_lock"""
+    if lock_file is None:
+        return
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+    except OSError:
+        pass
+    finally:
+        lock_file.close()
 
 
 def get_company_hash(company: dict) -> str:
@@ -204,8 +365,75 @@ def get_company_hash(company: dict) -> str:
 # SELENIUM SCRAPER
 # ============================================
 
+def get_chrome_version() -> str:
+    """Return the installed Chrome version string, or "" if it can't be found"""
+    candidates = [os.getenv("CHROME_BINARY", ""), "google-chrome", "google-chrome-stable",
+                  "chromium", "chromium-browser"]
+    for binary in candidates:
+        if not binary:
+            continue
+        try:
+            result = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = re.search(r"\d+(\.\d+)+", result.stdout)
+        if match:
+            return match.group(0)
+    return ""
+
+
+def driver_cache_key() -> str:
+    """Key the cached chromedriver path by platform and Chrome major version"""
+    chrome_major = get_chrome_version().split(".")[0] or "unknown"
+    return f"{sys.platform}-{platform.machine()}-chrome{chrome_major}"
+
+
+def resolve_chromedriver_path() -> str:
+    """Find chromedriver, calling webdriver-manager only on a cache miss"""
+    if CHROMEDRIVER_PATH:
+        return CHROMEDRIVER_PATH
+    
+    key = driver_cache_key()
+    try:
+        with open(DRIVER_CACHE_FILE, 'r') as f:
+            cached = json.load(f)
+        if cached.get("key") == key and os.path.exists(cached.get("path", "")):
+            logger.info(f"Using cached chromedriver: {cached['path']}")
+            return cached["path"]
+    except (OSError, ValueError):
+        pass
+    
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+    
+    try:
+        os.makedirs(os.path.dirname(DRIVER_CACHE_FILE), exist_ok=True)
+        tmp_file = f"{DRIVER_CACHE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"key": key, "path": path}, f)
+        os.replace(tmp_file, DRIVER_CACHE_FILE)
+    except OSError as e:
+        logger.warning(f"Could not cache chromedriver path: {e}")
+    return path
+
+
+def clear_driver_cache():
+    """Forget the cached chromedriver path (e.g. after it failed to start)"""
+    try:
+        os.remove(DRIVER_CACHE_FILE)
+    except OSError:
+        pass
+
+
 def create_driver():
     """Create a headless Chrome driver"""
+    import_started = time.perf_counter()
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    RUN_TIMINGS["selenium import"] = time.perf_counter() - import_started
+    
+    driver_started = time.perf_counter()
     chrome_options = Options()
     chrome_options.add_argument("--headless=new")
     chrome_options.add_argument("--no-sandbox")
@@ -223,24 +451,30 @@ def create_driver():
         chrome_options.binary_location = chrome_binary
     
     try:
-        # Try with webdriver-manager first
-        from webdriver_manager.chrome import ChromeDriverManager
+        # Try the configured/cached/webdriver-manager chromedriver first
+        driver_path = resolve_chromedriver_path()
         driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
+            service=Service(driver_path),
             options=chrome_options
         )
-        logger.info("Created Chrome driver with webdriver-manager")
+        logger.info(f"Created Chrome driver with {driver_path}")
     except Exception as e:
-        logger.warning(f"webdriver-manager failed: {e}, trying default")
+        logger.warning(f"chromedriver lookup failed: {e}, trying default")
+        clear_driver_cache()
         # Fallback for cloud hosting
         driver = webdriver.Chrome(options=chrome_options)
         logger.info("Created Chrome driver with default")
     
+    RUN_TIMINGS["driver startup"] = time.perf_counter() - driver_started
     return driver
 
 
 def login_to_tpo(driver) -> bool:
     """Login to TPO portal"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    
     try:
         logger.info(f"Navigating to {TPO_URL}")
         driver.get(TPO_URL)
@@ -440,6 +674,8 @@ def login_to_tpo(driver) -> bool:
 
 def extract_detail_value(driver, label: str) -> str:
     """Extract a value from the detail page by label"""
+    from selenium.webdriver.common.by import By
+    
     try:
         elements = driver.find_elements(By.XPATH, f"//*[contains(text(),'{label}')]")
         for elem in elements:
@@ -459,6 +695,8 @@ def extract_detail_value(driver, label: str) -> str:
 
 def scrape_companies(driver) -> list:
     """Scrape company data from the dashboard with detailed info"""
+    from selenium.webdriver.common.by import By
+    
     companies = []
     
     try:
@@ -555,6 +793,60 @@ def scrape_companies(driver) -> list:
     return companies
 
 
+# ============================================
+# CHANGE PROBE (skip the browser when nothing changed)
+# ============================================
+
+def probe_for_changes(data: dict):
+    """Cheaply check PROBE_URL for changes since the last full check.
+
+    Returns (changed, fingerprint). The fingerprint should be saved with the
+    data after a successful full check. Any probe failure counts as changed.
+    """
+    if not PROBE_URL:
+        return True, None
+    
+    probe_started = time.perf_counter()
+    previous = data.get("probe") or {}
+    
+    # Force a full check if the last one is too old, whatever the probe says
+    stale = True
+    if data.get("last_check"):
+        try:
+            age = (datetime.now() - datetime.fromisoformat(data["last_check"])).total_seconds()
+            stale = age > PROBE_MAX_SKIP
+        except ValueError:
+            pass
+    
+    try:
+        headers = {}
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+        response = requests.get(PROBE_URL, headers=headers, timeout=15)
+        
+        if response.status_code == 304:
+            fingerprint = previous
+        elif response.ok:
+            fingerprint = {
+                "etag": response.headers.get("ETag", ""),
+                "last_modified": response.headers.get("Last-Modified", ""),
+                "hash": hashlib.sha256(response.content).hexdigest(),
+            }
+        else:
+            logger.warning(f"Probe returned HTTP {response.status_code}, running full check")
+            return True, None
+    except Exception as e:
+        logger.warning(f"Probe failed: {e}, running full check")
+        return True, None
+    finally:
+        RUN_TIMINGS["probe"] = time.perf_counter() - probe_started
+    
+    changed = stale or fingerprint.get("hash") != previous.get("hash")
+    return changed, fingerprint
+
+
 # ============================================
 # NOTIFICATION LOGIC
 # ============================================
@@ -563,55 +855,80 @@ def format_company_notification(company: dict, is_new: bool = True) -> str:
     """Format a company notification message"""
     status = "🆕 NEW COMPANY LISTED!" if is_new else "📋 Company Update"
     
+    # Escape scraped values, Telegram rejects HTML messages with a bare "&" or "<"
+    def field(key: str, default: str = 'N/A') -> str:
+        return html.escape(company.get(key, '') or default)
+    
     # Format stipend
-    min_stip = company.get('Min Stipend', '') or '0'
-    max_stip = company.get('Max Stipend', '') or '0'
+    min_stip = field('Min Stipend', '0')
+    max_stip = field('Max Stipend', '0')
     
     # Format location
-    location = company.get('Job Locations', '') or 'Not specified'
+    location = field('Job Locations', 'Not specified')
     
     msg = f"""
 {status}
 
-🏢 <b>{company.get('Company', 'N/A')}</b>
+🏢 <b>{field('Company')}</b>
 
-💰 <b>Package:</b> ₹{company.get('Min Package (LPA)', 'N/A')} - ₹{company.get('Max Package (LPA)', 'N/A')} LPA
+💰 <b>Package:</b> ₹{field('Min Package (LPA)')} - ₹{field('Max Package (LPA)')} LPA
 💵 <b>Stipend:</b> ₹{min_stip} - ₹{max_stip}
-📋 <b>Type:</b> {company.get('Placement Type', 'N/A')}
+📋 <b>Type:</b> {field('Placement Type')}
 📍 <b>Location:</b> {location}
 📅 <b>Registration:</b>
-   • Start: {company.get('Registration Start', 'N/A')}
-   • End: {company.get('Registration End', 'N/A')}
+   • Start: {field('Registration Start')}
+   • End: {field('Registration End')}
 
 🔗 <b>Apply:</b> https://tpo.vierp.in/company-dashboard
 """
     return msg
 
 
-def check_for_new_companies():
-    """Main function to check for new companies"""
+def check_for_new_companies(use_probe: bool = False):
+    """Main function to check for new companies.
+
+    With use_probe, the browser is skipped when PROBE_URL shows no change.
+    Returns the list of newly found companies, or None if the check failed.
+    """
     logger.info("=" * 50)
     logger.info("Starting company check...")
     
-    # Load known companies
-    data = load_known_companies()
-    known_hashes = {get_company_hash(c) for c in data["companies"]}
+    # Make sure no other instance is mid-check on the same data file
+    acquired, lock_file = acquire_instance_lock()
+    if not acquired:
+        logger.warning(f"Another check is already running ({LOCK_FILE} is locked), skipping")
+        return None
     
     driver = None
     try:
+        # Load known companies
+        data = load_known_companies()
+        known_hashes = {get_company_hash(c) for c in data["companies"]}
+        
+        # Skip the browser entirely if the probe shows nothing changed
+        probe_fingerprint = None
+        if use_probe:
+            changed, probe_fingerprint = probe_for_changes(data)
+            if not changed:
+                logger.info("Probe shows no change, skipping browser check")
+                return []
+        
         # Create browser and login
         driver = create_driver()
         
         if not login_to_tpo(driver):
             logger.error("Login failed, skipping this check")
-            return
+            return None
         
         # Scrape current companies
         current_companies = scrape_companies(driver)
         
         if not current_companies:
             logger.warning("No companies found, skipping update")
-            return
+            return None
+        
+        # Refresh the snapshot served to bot commands
+        update_snapshot(current_companies)
         
         # Find new companies
         new_companies = []
@@ -622,7 +939,13 @@ def check_for_new_companies():
                 known_hashes.add(company_hash)
         
         # Send notifications for new companies
-        if new_companies:
+        if new_companies and data.get("state_lost"):
+            # Saved state was corrupt: re-baseline rather than re-alerting everything
+            logger.warning(f"Saved state was lost, treating {len(new_companies)} companies as known")
+            send_notification(f"⚠️ TPO Notifier: saved company list was corrupt and has been rebuilt "
+                              f"({len(current_companies)} companies) without re-sending alerts.")
+            new_companies = []
+        elif new_companies:
             logger.info(f"Found {len(new_companies)} new companies!")
             
             # Send header
@@ -645,16 +968,361 @@ def check_for_new_companies():
         
         # Update known companies
         data["companies"] = current_companies
+        if probe_fingerprint:
+            data["probe"] = probe_fingerprint
         save_known_companies(data)
+        return new_companies
         
     except Exception as e:
         logger.error(f"Error during check: {e}")
         send_notification(f"⚠️ TPO Notifier Error: {str(e)[:200]}")
+        return None
     
     finally:
         if driver:
             driver.quit()
             logger.info("Browser closed")
+        release_instance_lock(lock_file)
+
+
+# ============================================
+# COMPANY SNAPSHOT (served to bot commands)
+# ============================================
+
+# Latest scrape kept in memory so commands never launch Chrome.
+# The dict is replaced wholesale on update and never mutated, so a reader can keep
+# using the snapshot returned by get_snapshot() after the lock is released.
+_snapshot_lock = threading.Lock()
+_snapshot = {"companies": [], "updated": None, "index": []}
+
+# Date formats seen on the portal for registration start/end
+PORTAL_DATETIME_FORMATS = ["%d-%m-%Y %H:%M", "%d/%m/%Y %H:%M", "%d-%b-%Y %H:%M", "%Y-%m-%d %H:%M"]
+PORTAL_DATE_FORMATS = ["%d-%m-%Y", "%d/%m/%Y", "%d-%b-%Y", "%d %b %Y", "%Y-%m-%d"]
+
+
+def normalize_company_name(name: str) -> str:
+    """Lowercase a company name and collapse punctuation/whitespace"""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name.lower()).split())
+
+
+def build_name_index(companies: list) -> list:
+    """Build a sorted (key, position) index over every word-suffix of each name.
+
+    "vois vodafone" is indexed as both "vois vodafone" and "vodafone", so a
+    bisect prefix search matches the start of any word in the name.
+    """
+    index = []
+    for pos, company in enumerate(companies):
+        words = normalize_company_name(company.get("Company", "")).split()
+        for i in range(len(words)):
+            index.append((" ".join(words[i:]), pos))
+    index.sort()
+    return index
+
+
+def update_snapshot(companies: list, updated: str = None):
+    """Replace the in-memory snapshot with the latest scraped companies"""
+    global _snapshot
+    snapshot = {
+        "companies": list(companies),
+        "updated": updated or datetime.now().isoformat(),
+        "index": build_name_index(companies),
+    }
+    with _snapshot_lock:
+        _snapshot = snapshot
+
+
+def get_snapshot() -> dict:
+    """Return the current snapshot (treat as read-only)"""
+    with _snapshot_lock:
+        return _snapshot
+
+
+def find_companies(query: str, limit: int = 5) -> list:
+    """Find companies by name: exact, then word-prefix, then fuzzy match"""
+    snapshot = get_snapshot()
+    companies, index = snapshot["companies"], snapshot["index"]
+    key = normalize_company_name(query)
+    if not key or not index:
+        return []
+    
+    positions = []
+    
+    # Prefix matches via bisect on the sorted index (covers exact matches too)
+    start = bisect.bisect_left(index, (key, -1))
+    for entry_key, pos in index[start:]:
+        if not entry_key.startswith(key):
+            break
+        if pos not in positions:
+            positions.append(pos)
+    
+    # Fall back to fuzzy matching for typos
+    if not positions:
+        keys = [entry_key for entry_key, _ in index]
+        for match in difflib.get_close_matches(key, keys, n=limit, cutoff=0.6):
+            for entry_key, pos in index[bisect.bisect_left(index, (match, -1)):]:
+                if entry_key != match:
+                    break
+                if pos not in positions:
+                    positions.append(pos)
+    
+    # Whole-name exact matches first
+    positions.sort(key=lambda p: normalize_company_name(companies[p].get("Company", "")) != key)
+    return [companies[p] for p in positions[:limit]]
+
+
+def parse_portal_date(value: str):
+    """Parse a portal date string.
+
+    Returns (datetime, has_time), or (None, False) if the format is unknown.
+    """
+    value = (value or "").strip()
+    for formats, has_time in ((PORTAL_DATETIME_FORMATS, True), (PORTAL_DATE_FORMATS, False)):
+        for fmt in formats:
+            try:
+                return datetime.strptime(value, fmt), has_time
+            except ValueError:
+                continue
+    return None, False
+
+
+def is_registration_open(company: dict, now: datetime = None) -> bool:
+    """Check if registration is still open (unknown end dates count as open)"""
+    now = now or datetime.now()
+    end, has_time = parse_portal_date(company.get("Registration End", ""))
+    if end is None:
+        return True
+    if not has_time:
+        # Date-only values close at the end of that day
+        return end.date() >= now.date()
+    return end >= now
+
+
+# ============================================
+# ON-DEMAND CHECKS (coalesced)
+# ============================================
+
+# The check currently running, shared by everyone who asks for one meanwhile
+_check_state_lock = threading.Lock()
+_check_in_flight = None
+
+
+def is_check_running() -> bool:
+    """Check whether a scrape is currently in progress"""
+    with _check_state_lock:
+        return _check_in_flight is not None
+
+
+def run_coalesced_check():
+    """Run a company check, or wait for the one already in flight.
+
+    Concurrent callers (the service loop and /check commands) share a single
+    scrape and its result instead of launching Chrome once each.
+    """
+    global _check_in_flight
+    with _check_state_lock:
+        flight = _check_in_flight
+        is_leader = flight is None
+        if is_leader:
+            flight = _check_in_flight = {"done": threading.Event(), "result": None}
+    
+    if not is_leader:
+        flight["done"].wait()
+        return flight["result"]
+    
+    try:
+        flight["result"] = check_for_new_companies()
+    finally:
+        with _check_state_lock:
+            _check_in_flight = None
+        flight["done"].set()
+    return flight["result"]
+
+
+# ============================================
+# TELEGRAM BOT COMMANDS (long-polling)
+# ============================================
+
+TELEGRAM_MAX_MESSAGE_LENGTH = 4000  # API limit is 4096, leave headroom
+
+BOT_HELP_TEXT = """
+🤖 <b>TPO Notifier Commands</b>
+
+/list - All companies from the latest check
+/open - Companies with registration still open
+/company &lt;name&gt; - Details for a company
+/check - Check the portal for new companies now
+"""
+
+
+def format_company_line(company: dict) -> str:
+    """Format a one-line company summary for bot replies"""
+    name = html.escape(company.get("Company", "N/A"))
+    package = f"₹{company.get('Min Package (LPA)', 'N/A')} - ₹{company.get('Max Package (LPA)', 'N/A')} LPA"
+    end = company.get("Registration End", "") or "N/A"
+    return f"• <b>{name}</b> | {html.escape(package)} | ends {html.escape(end)}"
+
+
+def send_telegram_reply(chat_id: str, lines: list, header: str = ""):
+    """Send a reply, splitting it into several messages if it is too long"""
+    chunk = header
+    for line in lines:
+        if chunk and len(chunk) + len(line) + 1 > TELEGRAM_MAX_MESSAGE_LENGTH:
+            send_telegram_message(chunk, chat_id=chat_id)
+            chunk = ""
+        chunk = f"{chunk}\n{line}" if chunk else line
+    if chunk:
+        send_telegram_message(chunk, chat_id=chat_id)
+
+
+def snapshot_age_text() -> str:
+    """Describe when the snapshot was last updated"""
+    updated = get_snapshot()["updated"]
+    if not updated:
+        return "<i>No check has completed yet</i>"
+    try:
+        updated = datetime.fromisoformat(updated).strftime('%d-%b-%Y %H:%M')
+    except ValueError:
+        pass
+    return f"<i>As of {updated}</i>"
+
+
+def handle_list_command(chat_id: str, args: str):
+    """Reply with every company in the snapshot"""
+    companies = get_snapshot()["companies"]
+    if not companies:
+        send_telegram_message(f"📭 No companies known yet.\n{snapshot_age_text()}", chat_id=chat_id)
+        return
+    header = f"📋 <b>{len(companies)} Company(s)</b>\n{snapshot_age_text()}\n"
+    send_telegram_reply(chat_id, [format_company_line(c) for c in companies], header)
+
+
+def handle_open_command(chat_id: str, args: str):
+    """Reply with companies whose registration is still open"""
+    now = datetime.now()
+    companies = [c for c in get_snapshot()["companies"] if is_registration_open(c, now)]
+    if not companies:
+        send_telegram_message(f"📭 No open registrations.\n{snapshot_age_text()}", chat_id=chat_id)
+        return
+    header = f"✅ <b>{len(companies)} Open Registration(s)</b>\n{snapshot_age_text()}\n"
+    send_telegram_reply(chat_id, [format_company_line(c) for c in companies], header)
+
+
+def handle_company_command(chat_id: str, args: str):
+    """Reply with details for companies matching a name"""
+    if not args:
+        send_telegram_message("Usage: /company &lt;name&gt;", chat_id=chat_id)
+        return
+    matches = find_companies(args)
+    if not matches:
+        send_telegram_message(f"🔍 No company matching <b>{html.escape(args)}</b>", chat_id=chat_id)
+        return
+    for company in matches:
+        send_telegram_message(format_company_notification(company, is_new=False), chat_id=chat_id)
+
+
+def handle_check_command(chat_id: str, args: str):
+    """Start (or join) an on-demand check and report the result when it finishes"""
+    if is_check_running():
+        send_telegram_message("⏳ A check is already running, I'll report when it finishes.", chat_id=chat_id)
+    else:
+        send_telegram_message("🔄 Checking the TPO portal...", chat_id=chat_id)
+    
+    def worker():
+        new_companies = run_coalesced_check()
+        if new_companies is None:
+            send_telegram_message("⚠️ Check failed, see logs for details.", chat_id=chat_id)
+        elif new_companies:
+            send_telegram_reply(chat_id, [format_company_line(c) for c in new_companies],
+                                f"🆕 <b>{len(new_companies)} New Company(s)</b>\n")
+        else:
+            send_telegram_message(f"✅ No new companies.\n{snapshot_age_text()}", chat_id=chat_id)
+    
+    threading.Thread(target=worker, name="tpo-check", daemon=True).start()
+
+
+def handle_help_command(chat_id: str, args: str):
+    """Reply with the list of commands"""
+    send_telegram_message(BOT_HELP_TEXT, chat_id=chat_id)
+
+
+BOT_COMMANDS = {
+    "/list": handle_list_command,
+    "/open": handle_open_command,
+    "/company": handle_company_command,
+    "/check": handle_check_command,
+    "/start": handle_help_command,
+    "/help": handle_help_command,
+}
+
+
+def handle_telegram_update(update: dict):
+    """Dispatch a single getUpdates entry to its command handler"""
+    message = update.get("message") or {}
+    text = (message.get("text") or "").strip()
+    chat_id = str((message.get("chat") or {}).get("id", ""))
+    if not text.startswith("/"):
+        return
+    
+    # Only answer the configured chat
+    if chat_id != str(TELEGRAM_CHAT_ID):
+        logger.warning(f"Ignoring command from unknown chat {chat_id}")
+        return
+    
+    command, _, args = text.partition(" ")
+    command = command.split("@")[0].lower()  # strip "/list@BotName"
+    handler = BOT_COMMANDS.get(command)
+    if not handler:
+        send_telegram_message(f"Unknown command {html.escape(command)}\n{BOT_HELP_TEXT}", chat_id=chat_id)
+        return
+    
+    logger.info(f"Bot command: {command} {args}".strip())
+    handler(chat_id, args.strip())
+
+
+def poll_telegram_commands():
+    """Long-poll Telegram getUpdates forever and answer commands"""
+    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates"
+    session = requests.Session()
+    offset = None
+    # Commands queued while the service was down are stale, don't replay them
+    started = int(time.time())
+    
+    while True:
+        try:
+            params = {"timeout": TELEGRAM_POLL_TIMEOUT, "allowed_updates": json.dumps(["message"])}
+            if offset is not None:
+                params["offset"] = offset
+            response = session.get(url, params=params, timeout=TELEGRAM_POLL_TIMEOUT + 10)
+            result = response.json()
+            if not result.get("ok"):
+                logger.error(f"Telegram getUpdates error: {result}")
+                time.sleep(10)
+                continue
+            
+            for update in result.get("result", []):
+                offset = update["update_id"] + 1
+                if (update.get("message") or {}).get("date", 0) < started:
+                    continue
+                try:
+                    handle_telegram_update(update)
+                except Exception as e:
+                    logger.error(f"Error handling bot command: {e}")
+        except Exception as e:
+            logger.error(f"Telegram polling error: {e}")
+            time.sleep(10)
+
+
+def start_command_listener():
+    """Start the bot command listener in a background thread"""
+    # Serve the last saved companies until the first check completes
+    data = load_known_companies()
+    update_snapshot(data.get("companies", []), data.get("last_check"))
+    
+    thread = threading.Thread(target=poll_telegram_commands, name="tpo-bot", daemon=True)
+    thread.start()
+    logger.info("Telegram command listener started")
+    return thread
 
 
 # ============================================
@@ -667,8 +1335,12 @@ def run_service():
     logger.info("TPO Company Notification Service Started")
     logger.info(f"Check interval: {CHECK_INTERVAL} seconds ({CHECK_INTERVAL/60:.1f} minutes)")
     logger.info(f"WhatsApp enabled: {WHATSAPP_ENABLED}")
+    logger.info(f"Bot commands enabled: {TELEGRAM_COMMANDS_ENABLED}")
     logger.info("=" * 50)
     
+    if TELEGRAM_COMMANDS_ENABLED:
+        start_command_listener()
+    
     # Send startup notification
     send_notification(f"""
 🚀 <b>TPO Notifier Started!</b>
@@ -677,19 +1349,20 @@ def run_service():
 ⏰ Check Interval: {CHECK_INTERVAL/60:.0f} minutes
 📱 Telegram: ✅ Enabled
 📱 WhatsApp: {'✅ Enabled' if WHATSAPP_ENABLED else '❌ Disabled'}
+🤖 Commands: {'✅ /list /open /company /check' if TELEGRAM_COMMANDS_ENABLED else '❌ Disabled'}
 
 <i>Service started at {datetime.now().strftime('%d-%b-%Y %H:%M')}</i>
 """)
     
     # Initial check
-    check_for_new_companies()
+    run_coalesced_check()
     
     # Continuous monitoring loop
     while True:
         try:
             logger.info(f"Sleeping for {CHECK_INTERVAL} seconds...")
             time.sleep(CHECK_INTERVAL)
-            check_for_new_companies()
+            run_coalesced_check()
         except KeyboardInterrupt:
             logger.info("Service stopped by user")
             send_notification("🛑 TPO Notifier Service Stopped")
@@ -699,11 +1372,17 @@ def run_service():
             time.sleep(60)  # Wait a minute before retrying
 
 
+def format_run_timings() -> str:
+    """Format RUN_TIMINGS for the run summary (e.g. imports 0.21s, total 3.40s)"""
+    return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in RUN_TIMINGS.items())
+
+
 def run_once():
     """Run a single check (for testing or cron jobs)"""
     logger.info("Running single check...")
-    check_for_new_companies()
-    logger.info("Check complete")
+    check_for_new_companies(use_probe=True)
+    RUN_TIMINGS["total"] = time.perf_counter() - MODULE_LOAD_STARTED
+    logger.info(f"Check complete ({format_run_timings()})")
 
 
 # ============================================
@@ -711,8 +1390,6 @@ def run_once():
 # ============================================
 
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) > 1 and sys.argv[1] == "--once":
         # Single run mode (for cron/scheduled tasks)
         run_once()